@@ -8,12 +8,13 @@
 技术栈：
 - FastAPI: Web 框架
 - Pandas: 文件解析（CSV/XLSX）
-- Sentence-Transformers: 语义向量化（可选，当前使用简化版本）
+- Sentence-Transformers: 语义向量化（可选，未安装时回退到字符哈希向量）
 
 API 端点：
 - POST /api/parse/text: 解析手写文本输入
 - POST /api/parse/file: 解析文件（CSV/XLSX）
 - POST /api/semantic-links: 计算语义相似边
+- POST /api/embeddings/preload: 预计算词表 embedding 并写入磁盘（mmap 共享）
 - GET /api/health: 健康检查
 """
 
@@ -21,10 +22,66 @@ from fastapi import FastAPI, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import pandas as pd
+import numpy as np
+import asyncio
+import hashlib
 import io
-import math
+import json
+import logging
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 
-app = FastAPI(title="WordCloud Backend", version="0.2.0")
+logger = logging.getLogger(__name__)
+
+# Numba 可选：安装后哈希向量与两两相似度 top-K 会 JIT 编译为本地代码并行执行；
+# 未安装时 njit 退化为普通函数，调用方走 NumPy 实现
+try:
+    import numba
+    from numba import njit, prange
+    # 并行内核会在线程池中被并发调用（见 semantic_links）：只有 OpenMP 层支持多线程并发启动；
+    # TBB 层在工作线程中启动后会导致进程退出时挂起，因此排在始终可用的 workqueue 之后（实际不会被选中）。
+    # 运维已通过 NUMBA_THREADING_LAYER_PRIORITY 指定时不覆盖
+    if "NUMBA_THREADING_LAYER_PRIORITY" not in os.environ:
+        numba.config.THREADING_LAYER_PRIORITY = ["omp", "workqueue", "tbb"]
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda f: f
+
+    prange = range
+
+# FAISS 可选：词数较多时用 FAISS 索引（SIMD 内核）求 top-K，不构造 n×n 相似度矩阵
+try:
+    import faiss
+    _HAS_FAISS = True
+except ImportError:
+    _HAS_FAISS = False
+
+# xxhash 可选：上传文件的内容哈希（比 hashlib 快数倍），未安装时使用 blake2b
+try:
+    import xxhash
+    _HAS_XXHASH = True
+except ImportError:
+    _HAS_XXHASH = False
+
+# orjson 可选：安装后所有响应用 ORJSONResponse 序列化（比标准库 json 快数倍）
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+except ImportError:
+    from fastapi.responses import JSONResponse as DefaultResponse
+
+app = FastAPI(
+    title="WordCloud Backend",
+    version="0.3.0",
+    default_response_class=DefaultResponse,
+)
 
 # CORS 配置：允许前端跨域访问
 # 开发期：允许前端 Vite 开发服务器（5173/5174 都可能出现）
@@ -54,11 +111,15 @@ class SemanticLinksIn(BaseModel):
     topK: int = 3               # 每个词保留前 topK 个最相似的词
     threshold: float = 0.28     # 相似度阈值，低于此值的边会被过滤
 
+class EmbeddingsPreloadIn(BaseModel):
+    """预计算 embedding 的请求模型"""
+    words: list[dict]           # 固定词表：[{text: str, weight?: number}, ...]
+
 # ==================== 工具函数 ====================
 
-def _normalize_df_to_words(df: pd.DataFrame):
+def _df_text_weight(df: pd.DataFrame):
     """
-    将 DataFrame 转换为标准词表格式
+    从 DataFrame 中取出清洗后的词文本列与权重列
     
     支持的输入格式：
     1. 单列：只有词文本，weight 默认为 1.0
@@ -68,83 +129,175 @@ def _normalize_df_to_words(df: pd.DataFrame):
     - 自动去除全空行和全空列
     - 处理缺失值（NaN）
     - 权重解析失败时使用默认值 1.0
+    - 全部使用 pandas 列运算，没有逐行的 Python 循环和 try/except
     
     Args:
         df: pandas DataFrame，包含词数据
         
     Returns:
-        list[dict]: 标准词表格式 [{"text": str, "weight": float}, ...]
+        tuple[pd.Series, pd.Series]: (texts, weights)，索引一致，已去掉缺失/空白的词
     """
+    empty = pd.Series([], dtype=object), pd.Series([], dtype=float)
     if df is None or df.empty:
-        return []
+        return empty
 
     # 清理：去除全空列和全空行
     df = df.dropna(axis=1, how="all")
     df = df.dropna(axis=0, how="all")
     if df.empty:
-        return []
-
-    # 单列格式：只有词文本
-    if df.shape[1] == 1:
-        col0 = df.columns[0]
-        words = []
-        for v in df[col0].astype(str).tolist():
-            t = v.strip()
-            if t:
-                words.append({"text": t, "weight": 1.0})
-        return words
-
-    # 两列格式：词文本 + 权重
-    c0, c1 = df.columns[0], df.columns[1]
-    words = []
-    for a, b in zip(df[c0].tolist(), df[c1].tolist()):
-        if pd.isna(a):
-            continue
-        text = str(a).strip()
-        if not text:
-            continue
-        # 尝试解析权重，失败则使用默认值 1.0
-        try:
-            weight = float(b) if not pd.isna(b) else 1.0
-        except Exception:
-            weight = 1.0
-        words.append({"text": text, "weight": weight})
-    return words
+        return empty
+
+    # 词文本列：跳过缺失值，统一转为去除首尾空白的字符串
+    s = df.iloc[:, 0]
+    s = s[s.notna()].astype(str).str.strip()
+
+    # 权重列：两列格式解析第二列，无法解析的置为 1.0；单列格式 weight 全为 1.0
+    if df.shape[1] > 1:
+        w = pd.to_numeric(df.iloc[:, 1].loc[s.index], errors="coerce").fillna(1.0).astype(float)
+    else:
+        w = pd.Series(1.0, index=s.index)
+
+    mask = s.str.len() > 0
+    return s[mask], w[mask]
+
+def _merge_df_max(m: dict, df: pd.DataFrame):
+    """
+    将 DataFrame 中的词按列直接合并进去重累加器 m
+    
+    先用 groupby（C 层哈希聚合）在块内按词取最大 weight，
+    再只把不重复的词合并进 m，不再逐行构造 list[dict]。
+    
+    Args:
+        m: dict，累加器，原地更新
+        df: pandas DataFrame，一个文件块
+    """
+    texts, weights = _df_text_weight(df)
+    g = weights.groupby(texts, sort=False).max()
+    for t, w in zip(g.index.tolist(), g.tolist()):
+        if (t not in m) or (w > m[t]):
+            m[t] = w
 
-def _dedup(words):
+def _read_first_columns(read, f, **kwargs):
     """
-    去重：合并相同词的多个条目
+    只读取文件的前两列（词文本 + 权重）
     
-    策略：同词取最大 weight（保留权重最高的）
+    通过 usecols 限制列，宽表中其余列既不解析也不占内存；
+    文件只有一列时 usecols=[0, 1] 会报错，此时回到文件开头、只读第一列。
     
-    使用场景：
-    - 用户输入可能有重复词
-    - 文件解析时可能有重复行
-    - 确保每个词只出现一次
+    Args:
+        read: pd.read_csv 或 pd.read_excel
+        f: 可 seek 的二进制文件对象（从当前位置开始读取）
+        **kwargs: 传给 read 的其他参数
+        
+    Returns:
+        pd.DataFrame: 最多两列的 DataFrame（chunksize 时为分块迭代器）
+    """
+    start = f.tell()
+    try:
+        return read(f, usecols=[0, 1], **kwargs)
+    except UnicodeDecodeError:
+        raise
+    except ValueError:
+        f.seek(start)
+        return read(f, usecols=[0], **kwargs)
+
+# CSV 分块大小（行）：峰值内存由块大小与不重复词数决定，而不是文件总行数
+_CSV_CHUNKSIZE = 100_000
+
+def _parse_csv_chunks(f, **kwargs):
+    """
+    分块解析 CSV 并增量去重
+    
+    只读前两列、全部按字符串读取（跳过类型推断和 NaN 识别），
+    每块用 groupby 去重后立即合并进累加器，不保留完整的 DataFrame 或词表。
     
     Args:
-        words: list[dict]，原始词表
+        f: 可 seek 的二进制文件对象（CSV 内容，从当前位置开始读取）
+        **kwargs: 传给 pd.read_csv 的其他参数（如 encoding）
         
     Returns:
-        list[dict]: 去重后的词表，每个词只出现一次
+        dict: 去重累加器 {text: 最大 weight}
     """
     m = {}
-    for d in words:
-        t = str(d.get("text", "")).strip()
-        if not t:
-            continue
-        w = d.get("weight", 1.0)
-        try:
-            w = float(w)
-        except Exception:
-            w = 1.0
-        # 同词取最大 weight
-        if (t not in m) or (w > m[t]):
-            m[t] = w
-    return [{"text": k, "weight": v} for k, v in m.items()]
+    chunks = _read_first_columns(
+        pd.read_csv, f,
+        dtype=str, engine="c", na_filter=False, chunksize=_CSV_CHUNKSIZE, **kwargs,
+    )
+    with chunks:
+        for chunk in chunks:
+            _merge_df_max(m, chunk)
+    return m
+
+# 文件解析缓存：(扩展名, 内容哈希) -> 去重后的词表（LRU）
+# 按条目数和缓存的总词数双重限制，超大文件的解析结果不进入缓存，避免常驻内存
+_FILE_CACHE_MAX = 32
+_FILE_CACHE_MAX_WORDS = 500_000
+_FILE_CACHE: "OrderedDict[tuple, list]" = OrderedDict()
+_FILE_CACHE_WORDS = 0
+
+def _file_cache_put(key: tuple, words: list):
+    """写入 _FILE_CACHE，超出条目数或总词数上限时淘汰最久未用的条目"""
+    global _FILE_CACHE_WORDS
+    if len(words) > _FILE_CACHE_MAX_WORDS // 4:
+        return
+    old = _FILE_CACHE.pop(key, None)
+    if old is not None:
+        _FILE_CACHE_WORDS -= len(old)
+    _FILE_CACHE[key] = words
+    _FILE_CACHE_WORDS += len(words)
+    while len(_FILE_CACHE) > _FILE_CACHE_MAX or _FILE_CACHE_WORDS > _FILE_CACHE_MAX_WORDS:
+        _, evicted = _FILE_CACHE.popitem(last=False)
+        _FILE_CACHE_WORDS -= len(evicted)
+
+def _file_digest(f) -> str:
+    """
+    分块计算文件内容哈希（不把整个文件读入内存），结束后回到文件开头
+    
+    Args:
+        f: 可 seek 的二进制文件对象
+        
+    Returns:
+        str: 十六进制摘要（xxh3_128，未安装 xxhash 时为 blake2b-128）
+    """
+    h = xxhash.xxh3_128() if _HAS_XXHASH else hashlib.blake2b(digest_size=16)
+    f.seek(0)
+    for block in iter(lambda: f.read(1 << 20), b""):
+        h.update(block)
+    f.seek(0)
+    return h.hexdigest()
 
 # ==================== API 端点 ====================
 
+def _parse_upload(f, name: str) -> list:
+    """
+    解析上传的临时文件为去重后的词表（同步，由 parse_file 放到线程池中调用）
+    
+    Args:
+        f: 上传文件的临时文件对象（可 seek）
+        name: str，小写的文件名，用于判断格式
+        
+    Returns:
+        list[dict]: [{"text": str, "weight": float}, ...]
+    """
+    f.seek(0)
+    # CSV 文件解析：直接从上传的临时文件分块读取（不把整个文件读入内存），
+    # 每块转换后立即合并进去重累加器
+    if name.endswith(".csv"):
+        try:
+            m = _parse_csv_chunks(f)
+        except UnicodeDecodeError:
+            # 尝试 UTF-8 BOM 编码（Excel 导出的 CSV 常用）
+            f.seek(0)
+            m = _parse_csv_chunks(f, encoding="utf-8-sig")
+    # Excel 文件解析（需要随机访问，先读入内存；.xlsx 用 openpyxl 只读模式，.xls 交给 pandas 默认引擎）
+    else:
+        content = f.read()
+        engine = "openpyxl" if name.endswith(".xlsx") else None
+        df = _read_first_columns(pd.read_excel, io.BytesIO(content), engine=engine)
+        m = {}
+        _merge_df_max(m, df)
+    return [{"text": k, "weight": v} for k, v in m.items()]
+
 @app.get("/api/health")
 def health():
     """
@@ -174,10 +327,10 @@ def parse_text(payload: ParseTextIn):
     自然语言处理,86
     ```
     
-    处理流程：
+    处理流程（单次遍历完成）：
     1. 按行分割文本
     2. 解析每行：如果有逗号，分割为 word,weight；否则 weight=1.0
-    3. 去重（同词取最大 weight）
+    3. 边解析边去重（同词取最大 weight）
     
     Args:
         payload: ParseTextIn，包含 text 字段
@@ -185,28 +338,25 @@ def parse_text(payload: ParseTextIn):
     Returns:
         dict: {"words": [{"text": str, "weight": float}, ...]}
     """
-    lines = [x.strip() for x in (payload.text or "").splitlines()]
-    words = []
-    for line in lines:
-        if not line:
+    # 单次遍历：逐行解析的同时去重（同词取最大 weight），不再构造中间词表
+    m = {}
+    for line in (payload.text or "").splitlines():
+        # 按第一个逗号分割为 word,weight；没有逗号时 sep 为空
+        a, sep, b = line.partition(",")
+        t = a.strip()
+        if not t:
             continue
-        # 检查是否有逗号分隔（word,weight 格式）
-        if "," in line:
-            a, b = line.split(",", 1)
-            t = a.strip()
-            if not t:
-                continue
-            # 解析权重，失败则使用默认值 1.0
+        w = 1.0
+        if sep:
+            # 解析权重（float 会自行忽略首尾空白），失败则使用默认值 1.0
             try:
-                w = float(b.strip())
-            except Exception:
-                w = 1.0
-            words.append({"text": t, "weight": w})
-        else:
-            # 只有词文本，权重默认为 1.0
-            words.append({"text": line, "weight": 1.0})
-    # 去重：同词取最大 weight
-    words = _dedup(words)
+                w = float(b)
+            except ValueError:
+                pass
+        # 只在严格更大时写入
+        if (t not in m) or (w > m[t]):
+            m[t] = w
+    words = [{"text": k, "weight": v} for k, v in m.items()]
     return {"words": words}
 
 @app.post("/api/parse/file")
@@ -224,10 +374,12 @@ async def parse_file(file: UploadFile = File(...)):
     - 列名不严格要求，自动识别前两列
     
     处理流程：
+    0. 按文件内容哈希查 _FILE_CACHE，命中则直接返回
+    1-4 与哈希计算一样在线程池中执行（见 _parse_upload），不阻塞事件循环：
     1. 根据文件扩展名选择解析器
-    2. 使用 pandas 读取文件
+    2. 使用 pandas 读取文件（CSV 直接从上传的临时文件按 _CSV_CHUNKSIZE 行分块读取）
     3. 转换为标准词表格式
-    4. 去重
+    4. 去重（分块时逐块合并进同一个累加器）
     
     Args:
         file: UploadFile，上传的文件对象
@@ -236,94 +388,746 @@ async def parse_file(file: UploadFile = File(...)):
         dict: {"words": [...], "error": str}，成功时 error 为空
     """
     name = (file.filename or "").lower()
-    content = await file.read()
-
-    # CSV 文件解析
-    if name.endswith(".csv"):
-        try:
-            df = pd.read_csv(io.BytesIO(content))
-        except UnicodeDecodeError:
-            # 尝试 UTF-8 BOM 编码（Excel 导出的 CSV 常用）
-            df = pd.read_csv(io.BytesIO(content), encoding="utf-8-sig")
-    # Excel 文件解析
-    elif name.endswith(".xlsx") or name.endswith(".xls"):
-        df = pd.read_excel(io.BytesIO(content))
-    else:
+    if not name.endswith((".csv", ".xlsx", ".xls")):
         return {"words": [], "error": "unsupported_file_type"}
 
-    # 转换为标准词表格式并去重
-    words = _normalize_df_to_words(df)
-    words = _dedup(words)
+    # 同一文件重复上传（如反复调整 topK / threshold）时直接返回缓存的解析结果
+    key = (os.path.splitext(name)[1], await asyncio.to_thread(_file_digest, file.file))
+    words = _FILE_CACHE.get(key)
+    if words is not None:
+        _FILE_CACHE.move_to_end(key)
+        return {"words": words}
+
+    # 解析（读临时文件 + pandas 运算）在线程池中执行，不阻塞事件循环
+    words = await asyncio.to_thread(_parse_upload, file.file, name)
+    _file_cache_put(key, words)
     return {"words": words}
 
 # ==================== 语义边计算 ====================
 
+@njit(cache=True)
+def _hash_codes(codes, dim):
+    """
+    _hash_vector 的 Numba 内核：码点数组 -> 归一化 float32 向量
+    
+    Args:
+        codes: np.ndarray[uint32]，文本的 Unicode 码点
+        dim: int，向量维度
+        
+    Returns:
+        np.ndarray: 归一化后的 float32 向量
+    """
+    v = np.zeros(dim, dtype=np.float32)
+    if dim & (dim - 1) == 0:
+        # dim 为 2 的幂时取模等价于按位与，循环内无除法
+        mask = dim - 1
+        for i in range(codes.size):
+            v[(np.int64(codes[i]) + i * 131) & mask] += 1.0
+    else:
+        for i in range(codes.size):
+            v[(np.int64(codes[i]) + i * 131) % dim] += 1.0
+    norm = np.sqrt(np.sum(v * v))
+    if norm > 0:
+        v /= norm
+    return v
+
+@lru_cache(maxsize=100_000)
 def _hash_vector(text: str, dim: int = 16):
     """
     将文本转换为向量（简化版 embedding）
     
-    注意：这是一个轻量级的示例实现，用于演示。
-    生产环境建议使用：
-    - Sentence-BERT（sentence-transformers）
-    - OpenAI Embeddings API
-    - 其他预训练的语义向量模型
+    注意：这是一个轻量级的回退实现，仅在未安装 sentence-transformers 时使用。
+    它不具备真正的语义，生产环境请安装：
+    - Sentence-BERT（sentence-transformers，见 _get_model）
     
     当前实现：
     - 基于字符的哈希特征
-    - 使用字符位置和 ASCII 码生成特征
+    - 使用字符位置和码点生成特征（向量化，无逐字符 Python 循环）
     - L2 归一化
+    - 结果按 (text, dim) 做 LRU 缓存，重复的词不再重复计算
     
     Args:
         text: 输入文本
         dim: 向量维度（默认 16，实际应用建议 384 或 768）
         
     Returns:
-        list[float]: 归一化后的向量
+        np.ndarray: 归一化后的 float32 向量（只读，因为会被缓存共享）
     """
-    v = [0.0] * dim
-    # 基于字符位置和 ASCII 码生成特征
-    for i, ch in enumerate(text):
-        c = ord(ch)
-        # 使用哈希函数将字符映射到向量维度
-        idx = (c + i * 131) % dim
-        v[idx] += 1.0
-    # L2 归一化
-    norm = math.sqrt(sum(x * x for x in v)) or 1.0
-    return [x / norm for x in v]
+    # 基于字符位置和 Unicode 码点生成特征（utf-32-le 编码即码点数组，等价于 ord）
+    raw = text.encode("utf-32-le", "surrogatepass")
+    codes = np.frombuffer(raw, dtype=np.uint32)
+    if _HAS_NUMBA:
+        v = _hash_codes(codes, dim)
+    else:
+        pos = np.arange(codes.size, dtype=np.int64)
+        # 使用哈希函数将字符映射到向量维度，再一次 bincount 完成计数（C 层 scatter-add）
+        idx = codes.astype(np.int64) + pos * 131
+        if dim & (dim - 1) == 0:
+            # dim 为 2 的幂（默认 16）时用按位与代替取模
+            idx &= dim - 1
+        else:
+            idx %= dim
+        v = np.bincount(idx, minlength=dim).astype(np.float32)
+        # L2 归一化
+        v /= np.linalg.norm(v) or 1.0
+    v.setflags(write=False)
+    return v
+
+# Sentence-Transformers 模型名称（384 维，CPU 上也足够快）
+EMBED_MODEL_NAME = "all-MiniLM-L6-v2"
+
+_model = None
+_model_unavailable = False  # 未安装 sentence-transformers：进程内不再尝试
+_model_retry_at = 0.0       # 模型加载失败（如下载/网络错误）后，允许再次尝试的时间
+_MODEL_RETRY_SECONDS = 60
+_model_lock = threading.Lock()
 
-def _cosine(a, b):
+def _get_model():
     """
-    计算两个向量的余弦相似度
+    懒加载 Sentence-Transformers 模型（进程内只加载一次）
     
-    公式：cos(θ) = (a · b) / (||a|| ||b||)
+    模型在第一次计算语义边时才加载，避免拖慢服务启动。
+    如果未安装 sentence-transformers 或模型无法下载，返回 None，
+    调用方回退到 _hash_vector。
     
-    由于输入向量已归一化（L2 norm = 1），
-    余弦相似度 = 点积 = sum(a[i] * b[i])
+    未安装属于永久情况，只记录一次日志；下载或网络等 OSError 可能是暂时的，
+    记录日志后在 _MODEL_RETRY_SECONDS 秒后重试，期间回退到 _hash_vector。
+    
+    Returns:
+        SentenceTransformer | None
+    """
+    global _model, _model_unavailable, _model_retry_at
+    if _model is None and not _model_unavailable and time.monotonic() >= _model_retry_at:
+        with _model_lock:
+            if _model is None and not _model_unavailable and time.monotonic() >= _model_retry_at:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError:
+                    _model_unavailable = True
+                    logger.warning("sentence-transformers 未安装，语义边回退到字符哈希向量")
+                    return None
+                try:
+                    _model = SentenceTransformer(EMBED_MODEL_NAME)
+                except OSError:
+                    _model_retry_at = time.monotonic() + _MODEL_RETRY_SECONDS
+                    logger.exception(
+                        "加载 embedding 模型 %s 失败，%d 秒后重试；期间回退到字符哈希向量",
+                        EMBED_MODEL_NAME, _MODEL_RETRY_SECONDS,
+                    )
+    return _model
+
+# Embedding 缓存：text -> 归一化向量（LRU，进程级，跨请求复用）
+_EMB_CACHE_MAX = 100_000
+_EMB_CACHE: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_EMB_CACHE_LOCK = threading.Lock()
+
+def _encode(model, texts: list[str], batch_size: int = 64) -> np.ndarray:
+    """
+    调用模型批量 encode（不经过缓存）
     
     Args:
-        a: list[float]，归一化向量
-        b: list[float]，归一化向量
+        model: SentenceTransformer
+        texts: list[str]，待编码文本（应已去重）
+        batch_size: int，模型内部前向的 batch 大小
         
     Returns:
-        float: 余弦相似度，范围 [-1, 1]（归一化后通常为 [0, 1]）
+        np.ndarray: (n, dim) float32 矩阵，每行 L2 norm = 1
     """
-    return sum(x * y for x, y in zip(a, b))
+    V = model.encode(
+        texts,
+        batch_size=batch_size,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
+    return V.astype(np.float32, copy=False)
+
+def _cache_lookup(texts: list[str]) -> dict:
+    """先查预计算的 mmap 词表，再查 _EMB_CACHE：返回命中的 {text: 向量}，并刷新 LRU 顺序"""
+    found = _store_lookup(texts)
+    with _EMB_CACHE_LOCK:
+        for t in texts:
+            if t in found:
+                continue
+            v = _EMB_CACHE.get(t)
+            if v is not None:
+                _EMB_CACHE.move_to_end(t)
+                found[t] = v
+    return found
+
+def _cache_store(texts: list[str], M: np.ndarray, found: dict):
+    """将新编码的向量写回 _EMB_CACHE（超出上限时淘汰最久未用的），并填入 found"""
+    with _EMB_CACHE_LOCK:
+        for t, v in zip(texts, M):
+            v = v.copy()
+            _EMB_CACHE[t] = v
+            found[t] = v
+        while len(_EMB_CACHE) > _EMB_CACHE_MAX:
+            _EMB_CACHE.popitem(last=False)
+
+# 预计算 embedding 的存储目录：meta.json（模型名、词表、向量文件名）+ vectors-*.npy
+EMBED_STORE_DIR = os.environ.get(
+    "EMBED_STORE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".embeddings"),
+)
+
+_STORE = None           # (vocab: dict[str, int], V: np.memmap)
+_STORE_MTIME = None     # 已加载的 meta.json 的 mtime，文件更新后重新加载
+_STORE_LOCK = threading.Lock()
+
+def _load_store(meta_path: str):
+    """读取 meta.json 并以 mmap 打开对应的向量文件；模型与当前不一致时返回 None"""
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("model") != EMBED_MODEL_NAME:
+        return None
+    V = np.load(os.path.join(EMBED_STORE_DIR, meta["vectors"]), mmap_mode="r")
+    return {t: i for i, t in enumerate(meta["words"])}, V
+
+def _get_store():
+    """
+    加载预计算的 embedding（np.load(mmap_mode="r")，零拷贝）
+    
+    向量矩阵以只读 mmap 打开：多个 uvicorn worker 共享同一份操作系统页缓存，
+    每次请求只会读入用到的行所在的页。meta.json 更新后（其他 worker 重新预计算）
+    自动重新加载。
+    
+    读取时另一个 worker 可能正在替换 meta.json 并删除旧向量文件，此时重试一次；
+    仍然失败（如 meta.json 损坏）则记录日志并继续使用已加载的版本，
+    直到 meta.json 再次更新。
+    
+    Returns:
+        tuple[dict, np.memmap] | None: (text -> 行号, 向量矩阵)；
+            不存在或模型与当前不一致时返回 None
+    """
+    global _STORE, _STORE_MTIME
+    meta_path = os.path.join(EMBED_STORE_DIR, "meta.json")
+    try:
+        mtime = os.stat(meta_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _STORE_LOCK:
+        if mtime != _STORE_MTIME:
+            try:
+                _STORE = _load_store(meta_path)
+            except (OSError, ValueError, KeyError):
+                # 可能读到了正被替换的旧 meta.json（旧向量文件已删除）：重新 stat 后重试一次
+                try:
+                    mtime = os.stat(meta_path).st_mtime_ns
+                    _STORE = _load_store(meta_path)
+                except (OSError, ValueError, KeyError):
+                    logger.warning("加载预计算 embedding 失败，继续使用已加载的版本", exc_info=True)
+            _STORE_MTIME = mtime
+        return _STORE
+
+def _store_lookup(texts: list[str]) -> dict:
+    """从预计算的 mmap 词表中取出命中的 {text: 向量}（O(1) 查行号，只读取需要的行）"""
+    store = _get_store()
+    if store is None:
+        return {}
+    vocab, V = store
+    hit = [t for t in dict.fromkeys(texts) if t in vocab]
+    if not hit:
+        return {}
+    M = V[[vocab[t] for t in hit]]
+    return dict(zip(hit, M))
+
+def _save_store(texts: list[str], V: np.ndarray):
+    """
+    将词表及其 embedding 写入 EMBED_STORE_DIR（替换原有内容）
+    
+    先写新的向量文件，再原子替换 meta.json，
+    读者要么看到旧的词表+旧向量，要么看到新的词表+新向量。
+    
+    Args:
+        texts: list[str]，去重后的词表
+        V: (n, dim) float32 矩阵，与 texts 一一对应
+    """
+    os.makedirs(EMBED_STORE_DIR, exist_ok=True)
+    meta_path = os.path.join(EMBED_STORE_DIR, "meta.json")
+    old = None
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            old = json.load(f).get("vectors")
+    except (OSError, ValueError, AttributeError):
+        # 不存在或已损坏：直接覆盖，旧向量文件（如有）无法定位，保留在目录中
+        pass
+
+    name = f"vectors-{uuid.uuid4().hex}.npy"
+    with open(os.path.join(EMBED_STORE_DIR, name), "wb") as f:
+        np.save(f, np.ascontiguousarray(V, dtype=np.float32))
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"model": EMBED_MODEL_NAME, "vectors": name, "words": texts}, f, ensure_ascii=False)
+    os.replace(tmp, meta_path)
+
+    # 删除旧向量文件；其他 worker 仍在 mmap 时（Windows 下）删除会失败，留待下次
+    if old and old != name:
+        try:
+            os.remove(os.path.join(EMBED_STORE_DIR, old))
+        except OSError:
+            pass
+
+def _hash_embed(texts: list[str]) -> np.ndarray:
+    """回退路径：用 _hash_vector 生成归一化向量矩阵（_hash_vector 已归一化）"""
+    return np.stack([_hash_vector(t, 16) for t in texts])
+
+class _EncodeBatcher:
+    """
+    动态批处理（micro-batching）：合并并发请求的 encode
+    
+    多个 /api/semantic-links 请求同时到达时，如果各自调用 encode，
+    模型会执行 N 次小 batch 前向，矩阵乘法利用率很低。
+    这里把待编码文本放入 asyncio.Queue，由后台任务在 max_wait 时间窗内
+    收集最多 max_batch 条，合并为一次 encode，再把结果分发回各请求的 future。
+    
+    encode 本身在线程池中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, max_batch: int = 128, max_wait: float = 0.01):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = None
+        self._task = None
+
+    async def encode(self, texts: list[str]) -> np.ndarray:
+        """
+        提交一组文本并等待其向量
+        
+        Args:
+            texts: list[str]，待编码文本
+            
+        Returns:
+            np.ndarray: (n, dim) float32 矩阵，顺序与 texts 一致
+        """
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            # 后台任务懒启动，绑定到当前事件循环
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+        futures = []
+        for t in texts:
+            fut = loop.create_future()
+            self._queue.put_nowait((t, fut))
+            futures.append(fut)
+        return np.stack(await asyncio.gather(*futures))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # 在时间窗内继续收集，直到凑满 max_batch 或超时
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = list(dict.fromkeys(t for t, _ in batch))
+            try:
+                M = await asyncio.to_thread(_encode, _get_model(), texts, self.max_batch)
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            row = {t: i for i, t in enumerate(texts)}
+            for t, fut in batch:
+                if not fut.done():
+                    fut.set_result(M[row[t]])
+
+_ENCODE_BATCHER = _EncodeBatcher()
 
-def compute_links(words: list[str], topK: int = 3, threshold: float = 0.28):
+async def _embed(texts: list[str]) -> np.ndarray:
+    """
+    批量将文本转换为 L2 归一化的向量矩阵
+    
+    优先使用 Sentence-Transformers 的批量 encode；模型不可用时回退到 _hash_vector。
+    
+    缓存策略：
+    - 先查预计算的 mmap 词表和 _EMB_CACHE，只对未命中的文本（去重后）编码
+    - 未命中的文本交给 _ENCODE_BATCHER，与并发请求合并为一次 encode
+    - 前端反复提交相近的词表时，几乎全部命中，请求耗时只剩矩阵乘法
+    
+    模型加载（首次可能需要下载）和缓存查询（可能读取 mmap 页）都在线程池中执行，
+    不阻塞事件循环。由于输出已归一化，余弦相似度 = 点积，可直接用 V @ V.T 计算。
+    
+    Args:
+        texts: list[str]，文本列表（非空）
+        
+    Returns:
+        np.ndarray: (n, dim) float32 矩阵，每行 L2 norm = 1
+    """
+    model = await asyncio.to_thread(_get_model)
+    if model is None:
+        return await asyncio.to_thread(_hash_embed, texts)
+
+    found = await asyncio.to_thread(_cache_lookup, texts)
+    miss = list(dict.fromkeys(t for t in texts if t not in found))
+    if miss:
+        _cache_store(miss, await _ENCODE_BATCHER.encode(miss), found)
+    return np.stack([found[t] for t in texts])
+
+def _topk_neighbors(S: np.ndarray, topK: int, threshold: float):
+    """
+    从相似度矩阵中为每一行选出前 topK 个邻居
+    
+    使用 argpartition（introselect，O(n)）做部分选择，
+    只对选出的 K 个元素再做一次小排序，避免对整行 O(n log n) 排序。
+    
+    Args:
+        S: (b, n) 相似度矩阵（可为行块），自身位置应已置为 -inf
+        topK: int，每行保留的邻居数
+        threshold: float，相似度阈值
+        
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (source, target, sim) 三个等长数组，
+            同一 source 内按相似度降序排列
+    """
+    n = S.shape[1]
+    # k 不能超过 n - 1 个候选邻居
+    k = min(max(1, topK), n - 1)
+    idx = np.argpartition(-S, kth=k - 1, axis=1)[:, :k]
+    sims = np.take_along_axis(S, idx, axis=1)
+
+    # 仅在 K 个候选内排序（降序）
+    order = np.argsort(-sims, axis=1, kind="stable")
+    idx = np.take_along_axis(idx, order, axis=1)
+    sims = np.take_along_axis(sims, order, axis=1)
+
+    # 只保留相似度 >= threshold 的边
+    rows, cols = np.nonzero(sims >= threshold)
+    return rows, idx[rows, cols], sims[rows, cols]
+
+def _blocked_topk(V: np.ndarray, topK: int, threshold: float):
+    """
+    分块计算 V @ V.T 并逐块选出前 topK 个邻居
+    
+    每个行块只保留 K 个候选，完整的 n×n 相似度矩阵从不落地；
+    n 较小时只有一个块，等价于一次 GEMM。
+    
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: 同 _topk_neighbors
+    """
+    n = V.shape[0]
+    block = max(1, _TOPK_BLOCK_ELEMS // n)
+    parts = []
+    for start in range(0, n, block):
+        S = V[start:start + block] @ V.T
+        b = S.shape[0]
+        # 自身位置置为 -inf 以排除自环
+        S[np.arange(b), np.arange(start, start + b)] = -np.inf
+        rows, targets, sims = _topk_neighbors(S, topK, threshold)
+        parts.append((rows + start, targets, sims))
+    if len(parts) == 1:
+        return parts[0]
+    return tuple(np.concatenate(a) for a in zip(*parts))
+
+@njit(parallel=True, cache=True)
+def _pairwise_topk(V, topK, threshold):
+    """
+    Numba 并行版的两两相似度 + top-K（不构造 n×n 相似度矩阵）
+    
+    每一行由 prange 分配到不同核心：逐个计算与其他行的点积，
+    用一个大小为 K 的有序缓冲（作用同小顶堆）维护当前最相似的 K 个邻居。
+    点积是标量循环，只适合低维的哈希向量（dim <= _NUMBA_MAX_DIM）。
+    
+    Args:
+        V: (n, dim) float32 矩阵，每行 L2 norm = 1，n >= 2
+        topK: int，每行保留的邻居数
+        threshold: float，相似度阈值
+        
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (source int32, target int32, sim float32)，
+            同一 source 内按相似度降序排列
+    """
+    n, dim = V.shape
+    k = min(max(1, topK), n - 1)
+    src = np.full(n * k, -1, dtype=np.int32)
+    tgt = np.full(n * k, -1, dtype=np.int32)
+    sim = np.zeros(n * k, dtype=np.float32)
+    for i in prange(n):
+        best_j = np.full(k, -1, dtype=np.int32)
+        best_s = np.full(k, -np.inf, dtype=np.float32)
+        for j in range(n):
+            if j == i:
+                continue
+            s = np.float32(0.0)
+            for d in range(dim):
+                s += V[i, d] * V[j, d]
+            if s > best_s[k - 1]:
+                # 插入排序：保持 best_s 降序
+                p = k - 1
+                while p > 0 and best_s[p - 1] < s:
+                    best_s[p] = best_s[p - 1]
+                    best_j[p] = best_j[p - 1]
+                    p -= 1
+                best_s[p] = s
+                best_j[p] = j
+        for p in range(k):
+            if best_j[p] >= 0 and best_s[p] >= threshold:
+                src[i * k + p] = i
+                tgt[i * k + p] = best_j[p]
+                sim[i * k + p] = best_s[p]
+    keep = src >= 0
+    return src[keep], tgt[keep], sim[keep]
+
+_NUMBA_PARALLEL_SAFE = None  # None：尚未确定线程层
+_NUMBA_PARALLEL_LOCK = threading.Lock()
+
+def _numba_parallel_safe() -> bool:
+    """
+    _pairwise_topk 能否被多个线程并发调用
+    
+    线程层在第一次启动并行内核时才确定：这里在锁内用极小输入启动一次，
+    之后只有 OpenMP 层才允许使用该内核；workqueue 层被并发调用会直接终止进程，
+    此时调用方改走 _blocked_topk。
+    
+    Returns:
+        bool
+    """
+    global _NUMBA_PARALLEL_SAFE
+    if _NUMBA_PARALLEL_SAFE is None:
+        with _NUMBA_PARALLEL_LOCK:
+            if _NUMBA_PARALLEL_SAFE is None:
+                _pairwise_topk(np.zeros((2, 1), dtype=np.float32), 1, 0.0)
+                layer = numba.threading_layer()
+                if layer != "omp":
+                    logger.info("Numba 线程层为 %s，不支持并发启动，top-K 改用 NumPy 实现", layer)
+                _NUMBA_PARALLEL_SAFE = layer == "omp"
+    return _NUMBA_PARALLEL_SAFE
+
+# 词数超过 _FAISS_MIN_N 时改用 FAISS 精确索引（IndexFlatIP），
+# 超过 _HNSW_MIN_N 时改用 int8 量化的近似索引（IndexHNSWSQ）
+_FAISS_MIN_N = 2_000
+# Numba 内核的标量点积无法向量化，只在低维（哈希向量）时快于 BLAS GEMM；
+# 模型 embedding（384 维）始终走 _blocked_topk
+_NUMBA_MAX_DIM = 32
+# 阈值比较的容差：覆盖 float32 点积的舍入误差（约数个 ulp）
+_SIM_EPS = 1e-6
+# NumPy 回退路径中单个相似度行块的最大元素数（float32 约 64 MiB）
+_TOPK_BLOCK_ELEMS = 1 << 24
+_HNSW_MIN_N = 50_000
+
+def _exact_scores(V: np.ndarray, I: np.ndarray, block: int = 4096):
+    """
+    对候选邻居用 float32 精确重算相似度（分块计算，控制临时内存）
+    
+    Args:
+        V: (n, dim) float32 矩阵，每行 L2 norm = 1
+        I: (n, c) 候选邻居下标，-1 表示无效
+        block: int，每块的行数
+        
+    Returns:
+        np.ndarray: (n, c) float32 相似度，无效候选为 -inf
+    """
+    D = np.empty(I.shape, dtype=np.float32)
+    for s in range(0, I.shape[0], block):
+        cand = I[s:s + block]
+        D[s:s + block] = np.einsum("nd,ncd->nc", V[s:s + block], V[np.maximum(cand, 0)])
+    D[I < 0] = -np.inf
+    return D
+
+def _faiss_topk(V: np.ndarray, topK: int, threshold: float):
+    """
+    用 FAISS 索引为每个向量检索前 topK 个邻居
+    
+    以 V 自身建索引并一次性 search(V, k + 1)：结果中包含自身，去掉即可。
+    内积索引在归一化向量上即余弦相似度。
+    
+    HNSW 图检索以随机访存为主，受内存带宽/延迟限制：向量用 int8 标量量化（SQ8）存储，
+    每个分量只占 1 字节，索引内存约为 float32 的 1/4。量化误差会影响排序和相似度数值，
+    因此多取一倍候选，再用 float32 精确重算并重排（见 _exact_scores）。
+    精确的 IndexFlatIP 则保持 float32：批量查询走 BLAS GEMM，比逐对解码 int8 更快。
+    
+    Args:
+        V: (n, dim) float32 矩阵，每行 L2 norm = 1，n >= 2
+        topK: int，每行保留的邻居数
+        threshold: float，相似度阈值
+        
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (source, target, sim)，
+            同一 source 内按相似度降序排列
+    """
+    V = np.ascontiguousarray(V, dtype=np.float32)
+    n, dim = V.shape
+    k = min(max(1, topK), n - 1)
+
+    if n > _HNSW_MIN_N:
+        index = faiss.IndexHNSWSQ(
+            dim, faiss.ScalarQuantizer.QT_8bit, 32, faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(V)
+        index.add(V)
+        index.hnsw.efSearch = max(64, 4 * (k + 1))
+        D, I = index.search(V, min(n, 2 * (k + 1)))
+        D = _exact_scores(V, I)
+        order = np.argsort(-D, axis=1, kind="stable")[:, :k + 1]
+        I = np.take_along_axis(I, order, axis=1)
+        D = np.take_along_axis(D, order, axis=1)
+    else:
+        index = faiss.IndexFlatIP(dim)
+        index.add(V)
+        D, I = index.search(V, k + 1)
+
+    # 每行去掉一个结果：自身（通常在第一列）；近似检索或并列时自身可能不在结果中，则去掉最后一列
+    drop = I == np.arange(n)[:, None]
+    drop[~drop.any(axis=1), -1] = True
+    keep = ~drop
+    I = I[keep].reshape(n, k)
+    D = D[keep].reshape(n, k)
+
+    # 只保留有效（HNSW 结果不足时为 -1）且相似度 >= threshold 的边
+    rows, cols = np.nonzero((I >= 0) & (D >= threshold))
+    return rows, I[rows, cols], D[rows, cols]
+
+# 词数达到 _GPU_MIN_N 且有可用 CUDA 设备时，改用 GPU 上的 FP16 GEMM + topk
+_GPU_MIN_N = 20_000
+# GPU 上单个相似度行块的最大元素数（float16 约 128 MiB）
+_GPU_BLOCK_ELEMS = 1 << 26
+
+@lru_cache(maxsize=1)
+def _get_cuda_torch():
+    """
+    懒加载 torch，并检查 CUDA 是否可用（进程内只检查一次）
+    
+    torch 导入较慢，因此只在第一次遇到大词表时才导入，避免拖慢服务启动。
+    
+    Returns:
+        module | None: 有可用 CUDA 设备时返回 torch 模块，否则返回 None
+    """
+    try:
+        import torch
+    except ImportError:
+        return None
+    return torch if torch.cuda.is_available() else None
+
+def _gpu_topk(V: np.ndarray, topK: int, threshold: float):
+    """
+    在 GPU 上用 FP16 GEMM（tensor core）计算相似度并选出前 topK 个邻居
+    
+    向量只上传一次，按行块计算 S = V[i:i+B] @ V.T 并在显存中直接 topk，
+    回传到主机的只有每行 K 个候选。FP16 相似度误差约 1e-3，
+    对力导向布局的边权足够。
+    
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: 同 _topk_neighbors
+    """
+    torch = _get_cuda_torch()
+    n = V.shape[0]
+    k = min(max(1, topK), n - 1)
+    block = max(1, _GPU_BLOCK_ELEMS // n)
+    with torch.inference_mode():
+        Vt = torch.from_numpy(np.ascontiguousarray(V, dtype=np.float32)).cuda().half()
+        sims, idx = [], []
+        for start in range(0, n, block):
+            S = Vt[start:start + block] @ Vt.T
+            b = S.shape[0]
+            # 自身位置置为 -inf 以排除自环
+            r = torch.arange(b, device=S.device)
+            S[r, r + start] = float("-inf")
+            topv, topi = S.topk(k, dim=1)
+            sims.append(topv.float().cpu())
+            idx.append(topi.cpu())
+        sims = torch.cat(sims).numpy()
+        idx = torch.cat(idx).numpy()
+
+    # 只保留相似度 >= threshold 的边
+    rows, cols = np.nonzero(sims >= threshold)
+    return rows, idx[rows, cols], sims[rows, cols]
+
+def _links_from_vectors(V: np.ndarray, topK: int, threshold: float):
+    """
+    由归一化向量矩阵计算语义边（compute_links 的步骤 2-4）
+    
+    Args:
+        V: (n, dim) float32 矩阵，每行 L2 norm = 1
+        topK: int，每个词保留前 topK 个最相似的词
+        threshold: float，相似度阈值
+        
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (source, target, sim) 三个等长数组
+    """
+    # topK 来自请求且没有上限：先限制到 [1, n - 1]，再交给各实现（Numba 只接受 int64）
+    topK = min(max(1, int(topK)), V.shape[0] - 1)
+    # 相似度以 float32 计算，恰好等于阈值的边（如哈希向量常见的 0.5）会算成 0.49999997；
+    # 放宽 _SIM_EPS，使 sim >= threshold 在边界上保持原有含义
+    threshold = float(threshold) - _SIM_EPS
+    if V.shape[0] >= _GPU_MIN_N and _get_cuda_torch() is not None:
+        # 步骤 2-4（GPU）：FP16 分块 GEMM + topk，n² 次乘加交给 tensor core
+        rows, targets, values = _gpu_topk(V, topK, threshold)
+    elif _HAS_FAISS and V.shape[0] > _FAISS_MIN_N:
+        # 步骤 2-4（FAISS）：索引检索 top-K，内存不随 n² 增长
+        rows, targets, values = _faiss_topk(V, topK, threshold)
+    elif _HAS_NUMBA and V.shape[1] <= _NUMBA_MAX_DIM and _numba_parallel_safe():
+        # 步骤 2-4（Numba）：仅用于低维哈希向量；并行逐行点积 + 大小为 K 的缓冲选 top-K
+        V = np.ascontiguousarray(V, dtype=np.float32)
+        rows, targets, values = _pairwise_topk(V, topK, float(threshold))
+    else:
+        # 步骤 2-4: 按行块做 GEMM 并立即选出 topK，峰值内存 O(B·n) 而非 O(n²)
+        rows, targets, values = _blocked_topk(V, topK, threshold)
+    return rows, targets, values
+
+def _unique_texts(texts: list[str]):
+    """
+    对词文本去重，保留首次出现的顺序
+    
+    重复的词 embedding 完全相同，没必要重复编码和参与 O(n²) 的相似度计算。
+    
+    Returns:
+        tuple[list[str], np.ndarray, np.ndarray]: (uniq, inverse, first)
+            uniq: 去重后的词列表
+            inverse: (n,) 每个原始位置对应的 uniq 下标
+            first: (m,) 每个 uniq 词在原列表中首次出现的位置
+    """
+    index = {}
+    inverse = np.fromiter(
+        (index.setdefault(t, len(index)) for t in texts), dtype=np.intp, count=len(texts)
+    )
+    # uniq 按首次出现排序，因此 inverse 中每个值首次出现的位置即 first
+    _, first = np.unique(inverse, return_index=True)
+    return list(index), inverse, first
+
+def _expand_links(rows, targets, values, inverse, first):
+    """
+    把在去重词表上算出的边映射回原始词表
+    
+    每个原始位置都继承其 uniq 词的全部出边（source 展开到所有重复位置），
+    target 指向该词在原列表中的首次出现位置。
+    要求输入的边已按 source 升序分组（_links_from_vectors 的各路径均满足）。
+    
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: 原始下标上的 (source, target, sim)
+    """
+    counts = np.bincount(rows, minlength=len(first))
+    starts = np.cumsum(counts) - counts
+    # 原始位置 i 的出边即 uniq 行 inverse[i] 的 [starts, starts + counts) 段
+    c = counts[inverse]
+    offsets = np.cumsum(c) - c
+    idx = np.repeat(starts[inverse] - offsets, c) + np.arange(int(c.sum()))
+    new_rows = np.repeat(np.arange(len(inverse)), c)
+    return new_rows, first[targets[idx]], values[idx]
+
+async def compute_links(words: list[str], topK: int = 3, threshold: float = 0.28):
     """
     计算词之间的语义相似边
     
     算法流程：
-    1. 将每个词转换为向量（embedding）
-    2. 计算所有词对之间的余弦相似度
-    3. 对每个词，保留相似度最高的 topK 个邻居
+    1. 批量将每个词转换为 L2 归一化向量（embedding），得到 (n, dim) 的 float32 矩阵
+    2. 一次矩阵乘法 S = V @ V.T 得到全部余弦相似度
+    3. 对每个词，用 argpartition 选出相似度最高的 topK 个邻居（见 _topk_neighbors）
     4. 过滤掉相似度 < threshold 的边
     
-    复杂度：O(n²)，n 为词数
-    优化建议：
-    - 使用近似最近邻（ANN）算法（如 HNSW、FAISS）
-    - 缓存 embedding 向量
-    - 使用更高效的向量库（numpy）
+    复杂度：O(n²)，n 为去重后的词数（但 n² 次乘加全部在 BLAS 中完成，无 Python 循环）；
+    重复的词只编码、比较一次，再由 _expand_links 映射回原始下标
+    安装 faiss 后，n > _FAISS_MIN_N 时改用 FAISS 索引，
+    n > _HNSW_MIN_N 时改用 int8 量化的 HNSW 近似最近邻（见 _faiss_topk）；
+    有 CUDA 设备时，n >= _GPU_MIN_N 优先在 GPU 上做 FP16 GEMM（见 _gpu_topk）
     
     Args:
         words: list[str]，词列表
@@ -331,54 +1135,63 @@ def compute_links(words: list[str], topK: int = 3, threshold: float = 0.28):
         threshold: float，相似度阈值，低于此值的边会被过滤
         
     Returns:
-        list[dict]: 边列表，格式 [{"source": int, "target": int, "sim": float}, ...]
-                    source 和 target 是词在 words 列表中的索引
-    """
-    # 步骤 1: 将每个词转换为向量
-    vecs = [_hash_vector(w, 16) for w in words]
-    links = []
-    n = len(words)
-    
-    # 步骤 2-4: 计算相似度并筛选边
-    for i in range(n):
-        sims = []
-        # 计算词 i 与其他所有词的相似度
-        for j in range(n):
-            if i == j:
-                continue
-            sim = _cosine(vecs[i], vecs[j])
-            sims.append((j, sim))
-        
-        # 按相似度降序排序，取前 topK 个
-        sims.sort(key=lambda x: x[1], reverse=True)
-        for (j, sim) in sims[: max(1, topK)]:
-            # 只保留相似度 >= threshold 的边
-            if sim >= threshold:
-                links.append({"source": i, "target": j, "sim": float(sim)})
+        tuple[np.ndarray, np.ndarray, np.ndarray]: (source, target, sim) 三个等长数组，
+            source 和 target 是词在 words 列表中的索引
+    """
+    uniq, inverse, first = _unique_texts(words)
+    if len(uniq) < 2:
+        return np.empty(0, np.intp), np.empty(0, np.intp), np.empty(0, np.float32)
+
+    # 步骤 1: 批量将每个词转换为归一化向量，组成 (n, dim) 矩阵（经由动态批处理合并编码）
+    V = await _embed(uniq)
+    # 步骤 2-4: 相似度与 top-K 放到线程池执行
+    rows, targets, values = await asyncio.to_thread(_links_from_vectors, V, topK, threshold)
+    if len(uniq) < len(words):
+        rows, targets, values = _expand_links(rows, targets, values, inverse, first)
+    return rows, targets, values
+
+def _extract_texts(raw):
+    """
+    从词表中提取非空的词文本
     
-    return links
+    Args:
+        raw: list[dict] | None，词表 [{"text": str, "weight": float}, ...]
+        
+    Returns:
+        list[str]: 去除首尾空白后的词文本（保持原顺序）
+    """
+    texts = []
+    for d in raw or []:
+        t = str(d.get("text", "")).strip()
+        if t:
+            texts.append(t)
+    return texts
 
 @app.post("/api/semantic-links")
-def semantic_links(payload: SemanticLinksIn):
+async def semantic_links(payload: SemanticLinksIn):
     """
     计算语义相似边（用于力导向布局）
     
     输入：词表（带权重）
-    输出：语义边列表（source/target 使用词索引）
+    输出：语义边（source/target 使用词索引），以列式数组（structure-of-arrays）传输
     
     用途：
     - 力导向布局需要知道词之间的语义关系
     - 相似度高的词会被"拉近"，相似度低的词会被"推远"
     - 前端根据相似度设置边的长度和强度
     
-    输出格式：
-    - source: int，源词索引（在 words 列表中的位置）
-    - target: int，目标词索引
-    - sim: float，相似度 [0, 1]，越高越相似
+    输出格式（三个等长数组，第 i 条边为 sources[i] -> targets[i]）：
+    - sources: list[int]，源词索引（在 words 列表中的位置）
+    - targets: list[int]，目标词索引
+    - sims: list[float]，相似度 [0, 1]，越高越相似
+    
+    相比 [{"source", "target", "sim"}, ...]，省去了每条边重复的键名，
+    传输体积约减半；前端 api.js 负责还原为 links 数组。
     
     注意：
-    - 当前使用简化的哈希向量，生产环境建议替换为真实 embedding 模型
-    - 可以集成 Sentence-BERT、OpenAI Embeddings 等
+    - 默认使用 Sentence-BERT（all-MiniLM-L6-v2）计算 embedding
+    - 未安装 sentence-transformers 时回退到简化的哈希向量（无真实语义）
+    - 并发请求的 encode 会在约 10ms 时间窗内合并为一次前向（见 _EncodeBatcher）
     
     Args:
         payload: SemanticLinksIn，包含：
@@ -387,16 +1200,50 @@ def semantic_links(payload: SemanticLinksIn):
             - threshold: 相似度阈值（默认 0.28）
             
     Returns:
-        dict: {"links": [{"source": int, "target": int, "sim": float}, ...]}
+        DefaultResponse: {"sources": [int], "targets": [int], "sims": [float]}
     """
-    raw = payload.words or []
     # 提取词文本（忽略权重，语义相似度只依赖文本）
-    texts = []
-    for d in raw:
-        t = str(d.get("text", "")).strip()
-        if t:
-            texts.append(t)
+    texts = _extract_texts(payload.words)
+
+    # 计算语义边（见 compute_links）
+    rows, targets, values = await compute_links(
+        texts, int(payload.topK), float(payload.threshold)
+    )
+    # 直接返回 Response，跳过 FastAPI 对返回值逐元素的 jsonable_encoder
+    return DefaultResponse({
+        "sources": rows.tolist(),
+        "targets": targets.tolist(),
+        "sims": values.tolist(),
+    })
+
+@app.post("/api/embeddings/preload")
+async def preload_embeddings(payload: EmbeddingsPreloadIn):
+    """
+    预计算固定词表的 embedding，并写入磁盘供所有 worker 以 mmap 共享
+    
+    适用场景：词表（如业务词库）基本固定，/api/semantic-links 每次请求的词
+    都来自这个词表。预计算后，请求时按 text 查行号，直接从 mmap 矩阵取向量，
+    不再调用模型；配合操作系统页缓存，第二次起几乎零开销。
+    
+    注意：
+    - 每次调用都会替换之前预计算的词表
+    - 需要 Sentence-Transformers 模型；回退的哈希向量本身很便宜，无需预计算
+    
+    Args:
+        payload: EmbeddingsPreloadIn，包含：
+            - words: 词表 [{"text": str, "weight": float}, ...]
+            
+    Returns:
+        dict: {"count": int, "error": str}，count 为写入的词数，成功时 error 为空
+    """
+    model = await asyncio.to_thread(_get_model)
+    if model is None:
+        return {"count": 0, "error": "embedding_model_unavailable"}
+
+    texts = list(dict.fromkeys(_extract_texts(payload.words)))
+    if not texts:
+        return {"count": 0}
 
-    # 计算语义边
-    links = compute_links(texts, topK=int(payload.topK), threshold=float(payload.threshold))
-    return {"links": links}
+    V = await asyncio.to_thread(_encode, model, texts)
+    await asyncio.to_thread(_save_store, texts, V)
+    return {"count": len(texts)}
@@ -28,5 +28,8 @@ export async function getSemanticLinks(words, { topK = 3, threshold = 0.28 } = {
     body: JSON.stringify({ words, topK, threshold })
   });
   if (!res.ok) throw new Error("getSemanticLinks failed");
-  return res.json();
+  // 后端以列式数组返回 { sources, targets, sims }，这里还原为 links 数组
+  const { sources = [], targets = [], sims = [] } = await res.json();
+  const links = sources.map((source, i) => ({ source, target: targets[i], sim: sims[i] }));
+  return { links };
 }